@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -8,12 +10,61 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=".env",
         case_sensitive=True,
+        frozen=True,
+        extra="ignore",
     )
 
     database_url: str = Field(
         default=DEFAULT_DATABASE_URL,
         validation_alias="DATABASE_URL",
     )
+    db_pool_min_size: int = Field(
+        default=10,
+        validation_alias="DB_POOL_MIN_SIZE",
+    )
+    db_pool_max_size: int = Field(
+        default=50,
+        validation_alias="DB_POOL_MAX_SIZE",
+    )
+    db_command_timeout: float | None = Field(
+        default=None,
+        validation_alias="DB_COMMAND_TIMEOUT",
+    )
+    db_max_inactive_connection_lifetime: float = Field(
+        default=300,
+        validation_alias="DB_MAX_INACTIVE_CONNECTION_LIFETIME",
+    )
+    db_max_queries: int = Field(
+        default=50000,
+        validation_alias="DB_MAX_QUERIES",
+    )
+    db_statement_cache_size: int = Field(
+        default=1024,
+        validation_alias="DB_STATEMENT_CACHE_SIZE",
+    )
+    db_max_cached_statement_lifetime: float = Field(
+        default=0,
+        validation_alias="DB_MAX_CACHED_STATEMENT_LIFETIME",
+    )
+    db_max_cacheable_statement_size: int = Field(
+        default=0,
+        validation_alias="DB_MAX_CACHEABLE_STATEMENT_SIZE",
+    )
+    user_cache_enabled: bool = Field(
+        default=True,
+        validation_alias="USER_CACHE_ENABLED",
+    )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Return the application settings, loading them only once per process.
+
+    The environment and `.env` file are read on the first call; subsequent
+    calls return the same instance. Use `Depends(get_settings)` in routes.
+    """
+    return Settings()
 
 
-settings = Settings()
+settings = get_settings()
@@ -1,4 +1,8 @@
+from fastapi import Depends
+
+from app.core.config import get_settings
 from app.database.pool import db
+from app.database.users import UserRepository, user_cache
 
 
 async def get_db():
@@ -18,5 +22,23 @@ async def get_db():
             # Use conn to execute database queries
             ...
     """
-    async with db.get_connection() as conn:
+    async with db.pool.acquire() as conn:
         yield conn
+
+
+async def get_user_repository(conn=Depends(get_db)) -> UserRepository:
+    """
+    Dependency function to provide a UserRepository bound to the request's connection.
+
+    It is a coroutine so that FastAPI calls it on the event loop; a plain `def`
+    dependency would be sent through the threadpool on every request. The
+    process-wide user cache is passed in unless USER_CACHE_ENABLED is false.
+
+    Args:
+        conn (asyncpg.Connection): Database connection from `get_db`.
+
+    Returns:
+        UserRepository: A repository using the given connection.
+    """
+    cache = user_cache if get_settings().user_cache_enabled else None
+    return UserRepository(conn, cache)
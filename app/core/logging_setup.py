@@ -0,0 +1,38 @@
+"""Logging configuration that moves log output off the request path."""
+
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+def configure_logging(level: int = logging.INFO) -> QueueListener:
+    """
+    Configure root logging to emit records from a background thread.
+
+    The stock `QueueHandler` renders the message and any traceback on the
+    caller and drops the record's arguments and exception before enqueueing it,
+    so records from any library are safe to hand to another thread. A
+    QueueListener thread then applies `LOG_FORMAT` and writes them to stderr.
+    Like `logging.basicConfig`, the root logger is left untouched if it
+    already has handlers.
+
+    Args:
+        level (int): The root logger level.
+
+    Returns:
+        QueueListener: The started listener. Call `stop()` on shutdown to flush
+            pending records.
+    """
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    queue_handler = QueueHandler(log_queue)
+    # Only the message and traceback are rendered here; the listener adds the rest
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    logging.basicConfig(level=level, handlers=[queue_handler])
+
+    listener = QueueListener(log_queue, stream_handler)
+    listener.start()
+    return listener
@@ -1,19 +1,106 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerifyMismatchError
 from fastapi.security import HTTPBasic
-from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Argon2 cost parameters sized for a web API: 12 MiB per hash keeps memory
+# bounded under concurrent logins, and a single lane leaves CPU scheduling to
+# the server instead of argon2's own threads.
+ARGON2_TIME_COST = 3
+ARGON2_MEMORY_COST = 12 * 1024  # KiB
+ARGON2_PARALLELISM = 1
+ARGON2_HASH_LEN = 32
+
+password_hasher = PasswordHasher(
+    time_cost=ARGON2_TIME_COST,
+    memory_cost=ARGON2_MEMORY_COST,
+    parallelism=ARGON2_PARALLELISM,
+    hash_len=ARGON2_HASH_LEN,
+)
 auth_security = HTTPBasic()
 
+# Verified against when the email is unknown, so that path costs one argon2
+# verification like a wrong password and response times don't reveal which
+# accounts exist.
+DUMMY_PASSWORD_HASH = password_hasher.hash("dummy-password-for-timing")
+
+
+def _new_hash_pool() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=os.cpu_count(),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+# Argon2 is deliberately CPU and memory heavy, so it runs in worker processes
+# to keep the event loop free while a hash is computed. Workers are spawned
+# lazily on first use.
+_HASH_POOL = _new_hash_pool()
+
 
-def hash_password(password: str) -> str:
+def _sync_hash_password(password: str) -> str:
+    return password_hasher.hash(password)
+
+
+def _sync_verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return password_hasher.verify(hashed_password, plain_password)
+    except (VerifyMismatchError, InvalidHashError):
+        return False
+
+
+async def _run_in_hash_pool(func, *args):
     """
-    Hash the provided password using argon2 via Passlib.
+    Run `func(*args)` in the hashing pool, replacing the pool if it broke.
+
+    When a worker dies (for example killed by the OOM killer) the executor is
+    unusable for good, so it is swapped for a fresh one and the call is retried
+    once. Concurrent callers that hit the same broken pool replace it only once.
     """
-    return pwd_context.hash(password)
+    global _HASH_POOL
+    loop = asyncio.get_running_loop()
+    pool = _HASH_POOL
+    try:
+        return await loop.run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        if _HASH_POOL is pool:
+            _HASH_POOL = _new_hash_pool()
+            pool.shutdown(wait=False)
+        return await loop.run_in_executor(_HASH_POOL, func, *args)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+async def hash_password(password: str) -> str:
+    """
+    Hash the provided password using argon2, in a worker process.
     """
-    Verify a plain password against a hashed password.
+    return await _run_in_hash_pool(_sync_hash_password, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a plain password against a hashed password, in a worker process.
+    """
+    return await _run_in_hash_pool(
+        _sync_verify_password, plain_password, hashed_password
+    )
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Check whether a stored hash was made with outdated argon2 parameters.
+    """
+    return password_hasher.check_needs_rehash(hashed_password)
+
+
+def shutdown_hash_pool():
+    """
+    Stop the password hashing worker processes.
+
+    This should be called when shutting down the application.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    _HASH_POOL.shutdown()
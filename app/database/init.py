@@ -1,25 +1,118 @@
 """Database initialization and schema setup."""
 
-from app.database.pool import db
+import asyncpg
+
+from app.core.config import get_settings
+
+# Key of the transaction-level advisory lock that serializes `apply_schema`
+# when several workers start at once
+SCHEMA_LOCK_ID = 4_851_207_316
+
+CREATE_USERS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS users (
+    id UUID PRIMARY KEY,
+    email TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    is_active BOOLEAN DEFAULT FALSE,
+    activation_code CHAR(4),
+    activation_expires_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT now()
+);
+"""
+# Timestamp columns that tables created before TIMESTAMPTZ still store naive
+SELECT_NAIVE_TIMESTAMP_COLUMNS_SQL = """
+    SELECT column_name
+    FROM information_schema.columns
+    WHERE table_schema = current_schema()
+      AND table_name = 'users'
+      AND column_name IN ('activation_expires_at', 'created_at')
+      AND data_type = 'timestamp without time zone'
+"""
+
+# One-off data migrations record their name here once applied
+CREATE_SCHEMA_MIGRATIONS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    name TEXT PRIMARY KEY,
+    applied_at TIMESTAMPTZ DEFAULT now()
+);
+"""
+# Returns the name only the first time, telling the caller to run the migration
+CLAIM_MIGRATION_SQL = """
+    INSERT INTO schema_migrations (name)
+    VALUES ($1)
+    ON CONFLICT (name) DO NOTHING
+    RETURNING name
+"""
+
+# Lower-case emails stored before lookups were normalized. When several rows
+# collapse to one address, only the oldest is renamed and only if the address
+# is free, so the unique constraint always holds.
+NORMALIZE_EMAILS_SQL = """
+    UPDATE users
+    SET email = normalized.email
+    FROM (
+        SELECT DISTINCT ON (lower(email)) id, lower(email) AS email
+        FROM users
+        WHERE email <> lower(email)
+        ORDER BY lower(email), created_at
+    ) AS normalized
+    WHERE users.id = normalized.id
+      AND NOT EXISTS (
+          SELECT 1 FROM users AS taken WHERE taken.email = normalized.email
+      )
+"""
+
+
+async def apply_schema(connection: asyncpg.Connection):
+    """
+    Create the users table and upgrade one created by an older version.
+
+    Naive TIMESTAMP columns are converted to TIMESTAMPTZ, reading the stored
+    values as UTC, and emails stored with upper-case letters are lower-cased
+    to match `normalize_email`. Every step is idempotent, so this is safe to
+    run on each startup. The email rewrite scans the whole table, so it is
+    recorded in `schema_migrations` and only runs the first time.
+
+    The whole upgrade runs in one transaction under an advisory lock, so
+    workers starting together apply it one after another instead of racing on
+    the same ALTER TABLE.
+
+    Args:
+        connection (asyncpg.Connection): The connection to run the DDL on.
+    """
+    # DDL can wait on a lock held by another session, so bound it explicitly
+    async with connection.transaction():
+        await connection.execute(
+            "SELECT pg_advisory_xact_lock($1)", SCHEMA_LOCK_ID, timeout=30
+        )
+        await connection.execute(CREATE_USERS_TABLE_SQL, timeout=30)
+        await connection.execute(CREATE_SCHEMA_MIGRATIONS_TABLE_SQL, timeout=30)
+        naive_columns = await connection.fetch(SELECT_NAIVE_TIMESTAMP_COLUMNS_SQL)
+        for row in naive_columns:
+            column = row["column_name"]
+            await connection.execute(
+                f"ALTER TABLE users ALTER COLUMN {column} TYPE TIMESTAMPTZ "
+                f"USING {column} AT TIME ZONE 'UTC'",
+                timeout=30,
+            )
+        if await connection.fetchval(CLAIM_MIGRATION_SQL, "normalize_emails"):
+            await connection.execute(NORMALIZE_EMAILS_SQL, timeout=30)
 
 
 async def init_db():
     """
     Initialize database tables.
 
-    Creates the users table if it doesn't exist. The created_at field will
-    automatically be set to the current UTC timestamp when a row is inserted.
-    """
-    query = """
-    CREATE TABLE IF NOT EXISTS users (
-        id UUID PRIMARY KEY,
-        email TEXT UNIQUE NOT NULL,
-        password_hash TEXT NOT NULL,
-        is_active BOOLEAN DEFAULT FALSE,
-        activation_code CHAR(4),
-        activation_expires_at TIMESTAMP,
-        created_at TIMESTAMP DEFAULT now()
-    );
+    Creates the users table if it doesn't exist, or upgrades it (see
+    `apply_schema`). The created_at field will automatically be set to the
+    current timestamp when a row is inserted. Timestamps are stored as
+    TIMESTAMPTZ so timezone-aware datetimes round-trip unchanged.
+
+    The DDL runs on its own short-lived connection rather than the pool, so it
+    can run while the pool is being created.
     """
-    async with db.pool.acquire() as connection:
-        await connection.execute(query)
+    connection = await asyncpg.connect(dsn=get_settings().database_url)
+    try:
+        await apply_schema(connection)
+    finally:
+        await connection.close()
@@ -1,9 +1,31 @@
-from contextlib import asynccontextmanager
-from typing import AsyncGenerator
-
 import asyncpg
 
-from app.core.config import settings
+from app.core.config import get_settings
+
+# Session settings sent in the startup packet of every connection. The queries
+# here are tiny single-row lookups, where PostgreSQL's JIT compilation only adds
+# latency. Unlike a `SET` in the init hook, these survive the `RESET ALL` that
+# asyncpg runs when a connection is released back to the pool.
+SERVER_SETTINGS = {"jit": "off"}
+
+
+async def init_connection(conn: asyncpg.Connection):
+    """
+    Configure a new connection before it is added to the pool.
+
+    UUID columns are exchanged as their raw 16 bytes, so repositories can pass
+    `uuid.UUID.bytes` and read ids back without building `uuid.UUID` objects.
+
+    Args:
+        conn (asyncpg.Connection): The freshly opened connection.
+    """
+    await conn.set_type_codec(
+        "uuid",
+        schema="pg_catalog",
+        encoder=bytes,
+        decoder=bytes,
+        format="binary",
+    )
 
 
 class Database:
@@ -11,7 +33,8 @@ class Database:
     Database connection pool manager for PostgreSQL using asyncpg.
 
     This class manages the lifecycle of a connection pool to the PostgreSQL database.
-    It provides methods to connect, disconnect, and acquire connections from the pool.
+    It provides methods to connect and disconnect; connections are acquired directly
+    with `db.pool.acquire()`.
 
     Attributes:
         pool (asyncpg.Pool | None): The asyncpg connection pool. None until connect() is called.
@@ -25,18 +48,32 @@ class Database:
         """
         Establish a connection pool to the PostgreSQL database.
 
-        Creates an asyncpg connection pool with the configured database URL.
-        The pool will maintain between 2 and 10 idle connections with a 30 second timeout.
+        Creates an asyncpg connection pool with the configured database URL and
+        the `db_*` pool settings (size bounds, command timeout, idle lifetime and
+        queries per connection). The statement cache settings keep every
+        repository query prepared for the connection's lifetime (0 disables the
+        lifetime and size limits). asyncpg opens `db_pool_min_size` connections
+        before returning, so the pool is warm once this method completes.
+        Each new connection starts with `SERVER_SETTINGS` and is configured by
+        `init_connection`.
 
         Raises:
             asyncpg.InvalidDSNError: If the database URL is invalid.
             asyncpg.PostgresError: If connection to the database fails.
         """
+        settings = get_settings()
         self.pool = await asyncpg.create_pool(
             dsn=settings.database_url,
-            min_size=2,
-            max_size=10,
-            command_timeout=30,
+            min_size=settings.db_pool_min_size,
+            max_size=settings.db_pool_max_size,
+            max_queries=settings.db_max_queries,
+            max_inactive_connection_lifetime=settings.db_max_inactive_connection_lifetime,
+            command_timeout=settings.db_command_timeout,
+            statement_cache_size=settings.db_statement_cache_size,
+            max_cached_statement_lifetime=settings.db_max_cached_statement_lifetime,
+            max_cacheable_statement_size=settings.db_max_cacheable_statement_size,
+            server_settings=SERVER_SETTINGS,
+            init=init_connection,
         )
 
     async def disconnect(self):
@@ -49,23 +86,5 @@ class Database:
         if self.pool:
             await self.pool.close()
 
-    @asynccontextmanager
-    async def get_connection(self) -> AsyncGenerator[asyncpg.Connection, None]:
-        """
-        Acquire a connection from the pool as an async context manager.
-
-        This is a generator that yields a database connection and automatically
-        returns it to the pool when the context exits.
-
-        Yields:
-            asyncpg.Connection: A database connection from the pool.
-
-        Example:
-            async with db.get_connection() as conn:
-                await conn.execute("SELECT * FROM users")
-        """
-        async with self.pool.acquire() as connection:
-            yield connection
-
 
 db = Database()
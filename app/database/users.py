@@ -1,42 +1,119 @@
 import uuid
 from datetime import datetime, timedelta, timezone
 
+from cachetools import TTLCache
+
+# Queries are module constants so every call sends the exact same text and
+# hits asyncpg's per-connection prepared statement cache.
+INSERT_USER_SQL = """
+    INSERT INTO users (
+        id, email, password_hash, activation_code, activation_expires_at, is_active
+    )
+    VALUES ($1, $2, $3, $4, $5, false)
+    ON CONFLICT (email) DO NOTHING
+    RETURNING id
+"""
+SELECT_USER_BY_EMAIL_SQL = """
+    SELECT id, email, password_hash, is_active, activation_code, activation_expires_at
+    FROM users
+    WHERE email = $1
+"""
+ACTIVATE_USER_SQL = """
+    UPDATE users
+    SET is_active = true,
+        activation_code = NULL,
+        activation_expires_at = NULL,
+        password_hash = COALESCE($2, password_hash)
+    WHERE id = $1 AND NOT is_active
+"""
+
+# Activation usually follows signup within seconds, while the row is unchanged
+USER_CACHE_MAX_SIZE = 10_000
+USER_CACHE_TTL = 5  # seconds
+
+# User rows by normalized email, shared by every repository of the process.
+# Each worker has its own copy and does not see the others' writes, so a
+# cached password_hash or activation_code can be up to USER_CACHE_TTL seconds
+# stale. Activation itself is guarded in SQL, so a stale entry can never
+# activate an account twice.
+user_cache = TTLCache(maxsize=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL)
+
+
+def normalize_email(email: str) -> str:
+    """Return the canonical, lower-cased form under which emails are stored."""
+    return email.strip().lower()
+
 
 class UserRepository:
-    def __init__(self, conn):
+    def __init__(self, conn, cache: TTLCache | None = None):
         self.conn = conn
+        # Rows by normalized email, or None to always read the database
+        self.cache = cache
 
-    async def create_user(self, email: str, password_hash: str, code: str) -> str:
-        user_id = uuid.uuid4()
-        expires_at = (datetime.now(timezone.utc) + timedelta(minutes=1)).replace(
-            tzinfo=None
-        )
-        query = """
-            INSERT INTO users (
-                id, email, password_hash, activation_code, activation_expires_at, is_active
-            )
-            VALUES ($1, $2, $3, $4, $5, false)
+    async def create_user(
+        self, email: str, password_hash: str, code: str
+    ) -> bytes | None:
+        """
+        Insert a new inactive user.
+
+        Returns the new user's id, or None when the email is already taken.
         """
+        user_id = uuid.uuid4().bytes
+        email = normalize_email(email)
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=1)
 
-        await self.conn.execute(
-            query,
+        created_id = await self.conn.fetchval(
+            INSERT_USER_SQL,
             user_id,
             email,
             password_hash,
             code,
             expires_at,
         )
-        return email
+        if created_id is not None and self.cache is not None:
+            # Same keys as SELECT_USER_BY_EMAIL_SQL, so activation can skip it
+            self.cache[email] = {
+                "id": created_id,
+                "email": email,
+                "password_hash": password_hash,
+                "is_active": False,
+                "activation_code": code,
+                "activation_expires_at": expires_at,
+            }
+        return created_id
+
+    async def get_user_by_email(self, email: str) -> dict | None:
+        """
+        Return the user stored under `email`, from the cache when possible.
+
+        Rows read from the database are not cached here: the caller decides
+        with `cache_user` once the lookup is authenticated.
+        """
+        email = normalize_email(email)
+        if self.cache is not None:
+            user = self.cache.get(email)
+            if user is not None:
+                return user
+
+        row = await self.conn.fetchrow(SELECT_USER_BY_EMAIL_SQL, email)
+        return dict(row) if row is not None else None
 
-    async def get_user_by_email(self, email: str):
-        query = "SELECT * FROM users WHERE email = $1"
-        return await self.conn.fetchrow(query, email)
+    def cache_user(self, user: dict):
+        """Cache a user returned by `get_user_by_email` for the next lookups."""
+        if self.cache is not None:
+            # Keep an entry that is already there, its TTL is not extended
+            self.cache.setdefault(user["email"], user)
+
+    async def activate_user(
+        self, user_id: bytes, email: str, password_hash: str | None = None
+    ) -> bool:
+        """
+        Activate an inactive user, optionally replacing its password hash.
 
-    async def activate_user(self, user_id: uuid.UUID) -> bool:
-        query = """
-            UPDATE users
-            SET is_active = true, activation_code = NULL, activation_expires_at = NULL
-            WHERE id = $1
+        Returns False when the user was already active, which a stale cache
+        entry can hide from the caller.
         """
-        await self.conn.execute(query, user_id)
-        return True
+        status = await self.conn.execute(ACTIVATE_USER_SQL, user_id, password_hash)
+        if self.cache is not None:
+            self.cache.pop(normalize_email(email), None)
+        return status == "UPDATE 1"
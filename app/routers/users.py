@@ -1,8 +1,7 @@
-import asyncpg
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Response, status
 from fastapi.security import HTTPBasicCredentials
 
-from app.core.dependencies import get_db
+from app.core.dependencies import get_user_repository
 from app.core.security import auth_security
 from app.database.users import UserRepository
 from app.schemas.exceptions import ErrorResponse
@@ -20,13 +19,31 @@ common_responses = {
 
 users_router = APIRouter(tags=["users"], responses=common_responses)
 
+# The service is stateless, so a single instance serves every request
+user_service = UserService(EmailConsoleClient())
+
+
+def _json_response(user_response: UserResponse, status_code: int) -> Response:
+    """
+    Serialize a response model straight to JSON bytes.
+
+    Returning a `Response` skips FastAPI's response_model validation and
+    encoding pass; `response_model` is still declared on the routes so the
+    OpenAPI schema is unchanged.
+    """
+    return Response(
+        content=user_response.model_dump_json(),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
 
 @users_router.post(
     "/users", response_model=UserResponse, status_code=status.HTTP_201_CREATED
 )
 async def create_user(
-    user: UserCreate, conn: asyncpg.Connection = Depends(get_db)
-) -> UserResponse:
+    user: UserCreate, user_repository: UserRepository = Depends(get_user_repository)
+) -> Response:
     """
     Create a new user account.
 
@@ -39,10 +56,11 @@ async def create_user(
         user (UserCreate): The user data to create, containing:
             - email (str): A valid, unique email address.
             - password (str): A secure password (validation requirements apply).
-        conn (asyncpg.Connection): Database connection from the pool (dependency injected).
+        user_repository (UserRepository): Repository bound to a pooled database
+            connection (dependency injected).
 
     Returns:
-        UserResponse: A response model containing:
+        Response: The serialized UserResponse, containing:
             - email (str): The created user's email address.
             - status (str): Creation status ("created").
 
@@ -51,11 +69,8 @@ async def create_user(
         - 422 Unprocessable Content: Invalid request payload or validation failure.
         - 500 Internal Server Error: Database or email service error.
     """
-    user_repository = UserRepository(conn)
-    email_client = EmailConsoleClient()
-    user_service = UserService(user_repository, email_client)
-    user_response = await user_service.create_user(user)
-    return user_response
+    user_response = await user_service.create_user(user, user_repository)
+    return _json_response(user_response, status.HTTP_201_CREATED)
 
 
 @users_router.post(
@@ -63,9 +78,9 @@ async def create_user(
 )
 async def activate_user(
     user: UserActivate,
-    conn: asyncpg.Connection = Depends(get_db),
+    user_repository: UserRepository = Depends(get_user_repository),
     credentials: HTTPBasicCredentials = Depends(auth_security),
-) -> UserResponse:
+) -> Response:
     """
     Activate a user account with an activation code.
 
@@ -82,12 +97,13 @@ async def activate_user(
     Args:
         user (UserActivate): The activation data containing the activation code.
             Code must be exactly 4 digits (e.g., "1234").
-        conn (asyncpg.Connection): Database connection from the pool (dependency injected).
+        user_repository (UserRepository): Repository bound to a pooled database
+            connection (dependency injected).
         credentials (HTTPBasicCredentials): HTTP Basic authentication credentials
             containing email and password (dependency injected).
 
     Returns:
-        UserResponse: A response model containing the user's email and activation status.
+        Response: The serialized UserResponse with the user's email and activation status.
             Status will be "activated" on successful activation.
 
     Raises (HTTP responses):
@@ -96,8 +112,5 @@ async def activate_user(
         - 409 Conflict: User account is already activated.
         - 422 Unprocessable Content: Invalid request payload (e.g., code not 4 digits).
     """
-    user_repository = UserRepository(conn)
-    email_client = EmailConsoleClient()
-    user_service = UserService(user_repository, email_client)
-    user_response = await user_service.activate_user(user, credentials)
-    return user_response
+    user_response = await user_service.activate_user(user, credentials, user_repository)
+    return _json_response(user_response, status.HTTP_200_OK)
@@ -1,9 +1,11 @@
 from typing import Any, Dict, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class APIError(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     code: str = Field(description="A unique error code identifying the type of error")
     message: str = Field(description="A human-readable message describing the error")
     details: Optional[Dict[str, Any]] = Field(
@@ -12,4 +14,6 @@ class APIError(BaseModel):
 
 
 class ErrorResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     error: APIError = Field(description="The error information")
@@ -1,25 +1,42 @@
-from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
+
+from app.utils.constants import USER_STATUS_ACTIVATED, USER_STATUS_CREATED
 
 
 class UserCreate(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     email: EmailStr = Field(description="User's email address")
     password: str = Field(description="User's password")
 
 
 class UserActivate(BaseModel):
-    code: str = Field(description="Activation code sent to the user's email")
+    model_config = ConfigDict(frozen=True)
+
+    code: str = Field(
+        description="Activation code sent to the user's email (exactly 4 digits)",
+        json_schema_extra={"pattern": "^[0-9]{4}$"},
+    )
 
     @field_validator("code")
-    def check_code_value(cls, value):
+    @classmethod
+    def check_code_value(cls, value: str) -> str:
         if not value.strip():
             raise ValueError("Activation code cannot be empty")
         if len(value) != 4:
             raise ValueError("Activation code must be exactly 4 characters long")
-        if not value.isdigit():
+        # isascii() rejects non-ASCII digits, which a generated code never has
+        if not (value.isascii() and value.isdigit()):
             raise ValueError("Activation code must contain only digits")
         return value
 
 
 class UserResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     email: EmailStr = Field(description="User's email address")
-    status: str = Field(description="Status of the user account")
+    status: Literal[USER_STATUS_CREATED, USER_STATUS_ACTIVATED] = Field(
+        description="Status of the user account"
+    )
@@ -1,10 +1,11 @@
-import random
+import secrets
 from datetime import datetime, timezone
 
 from fastapi.security import HTTPBasicCredentials
 
-from app.core.security import hash_password, verify_password
-from app.database.users import UserRepository
+from app.core.security import (DUMMY_PASSWORD_HASH, hash_password,
+                               password_needs_rehash, verify_password)
+from app.database.users import UserRepository, normalize_email
 from app.schemas.users import UserActivate, UserCreate, UserResponse
 from app.utils.constants import USER_STATUS_ACTIVATED, USER_STATUS_CREATED
 from app.utils.exceptions.authentication import InvalidEmail, InvalidPassword
@@ -14,44 +15,55 @@ from app.utils.exceptions.users import (ExpiredActivationCode,
                                         UserAlreadyExists)
 from app.utils.smtp import EmailClient
 
+_CODE_FMT = "{:04d}".format
+
 
 class UserService:
-    def __init__(self, user_repository: UserRepository, email_client: EmailClient):
-        self.user_repository = user_repository
+    # The service holds no per-request state: the repository bound to the
+    # request's connection is passed to each public method.
+    def __init__(self, email_client: EmailClient):
         self.email_client = email_client
 
-    # Private method to generate a 4-digit activation code
+    # Private method to generate a 4-digit activation code from a CSPRNG
     def _generate_code(self) -> str:
-        return f"{random.randint(0, 9999):04d}"
+        return _CODE_FMT(secrets.randbelow(10000))
 
     # Public method to create a new user account
-    async def create_user(self, user: UserCreate) -> UserResponse:
-        if await self.user_repository.get_user_by_email(user.email):
-            raise UserAlreadyExists(email=user.email)
-
+    async def create_user(
+        self, user: UserCreate, user_repository: UserRepository
+    ) -> UserResponse:
+        # Report the email in the form it is stored and looked up under
+        email = normalize_email(user.email)
         # Hash the password
-        password_hash = hash_password(user.password)
+        password_hash = await hash_password(user.password)
         # Generate a unique code for the user
         code = self._generate_code()
-        # Create the user in the database
-        created_user_email = await self.user_repository.create_user(
-            user.email, password_hash, code
-        )
+        # Create the user in the database, the insert is skipped if the email exists
+        user_id = await user_repository.create_user(email, password_hash, code)
+        if user_id is None:
+            raise UserAlreadyExists(email=email)
         # Send a verification email to the user
-        await self.email_client.send_verification_email(created_user_email, code)
-        return UserResponse(email=created_user_email, status=USER_STATUS_CREATED)
+        await self.email_client.send_verification_email(email, code)
+        return UserResponse(email=email, status=USER_STATUS_CREATED)
 
     # Public method to activate a user account using the provided activation code and credentials
     async def activate_user(
-        self, user: UserActivate, credentials: HTTPBasicCredentials
+        self,
+        user: UserActivate,
+        credentials: HTTPBasicCredentials,
+        user_repository: UserRepository,
     ) -> UserResponse:
-        user_db = await self.user_repository.get_user_by_email(credentials.username)
+        user_db = await user_repository.get_user_by_email(credentials.username)
         # Check if the user exists in the database
         if not user_db:
+            # Spend the same argon2 work as a real check to keep timing uniform
+            await verify_password(credentials.password, DUMMY_PASSWORD_HASH)
             raise InvalidEmail(details={"email": credentials.username})
         # Verify the provided password against the stored password hash
-        if not verify_password(credentials.password, user_db["password_hash"]):
+        if not await verify_password(credentials.password, user_db["password_hash"]):
             raise InvalidPassword(details={"email": credentials.username})
+        # Only authenticated lookups may fill the cache
+        user_repository.cache_user(user_db)
         # Check if the user is already activated
         if user_db["is_active"]:
             raise UserAlreadyActivated(email=credentials.username)
@@ -59,11 +71,17 @@ class UserService:
         if user_db["activation_code"] != user.code:
             raise InvalidActivationCode(user.code)
         # Check if the activation code has expired
-        if user_db["activation_expires_at"] < (datetime.now(timezone.utc)).replace(
-            tzinfo=None
-        ):
+        if user_db["activation_expires_at"] < datetime.now(timezone.utc):
             raise ExpiredActivationCode(user.code)
 
-        # Activate the user account in the database
-        await self.user_repository.activate_user(user_db["id"])
+        # Upgrade the stored hash if it was made with outdated argon2 parameters
+        new_password_hash = None
+        if password_needs_rehash(user_db["password_hash"]):
+            new_password_hash = await hash_password(credentials.password)
+
+        # Activate the user account in the database, unless it already is
+        if not await user_repository.activate_user(
+            user_db["id"], user_db["email"], new_password_hash
+        ):
+            raise UserAlreadyActivated(email=credentials.username)
         return UserResponse(email=user_db["email"], status=USER_STATUS_ACTIVATED)
@@ -1,22 +1,59 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
+from functools import lru_cache
 
+import orjson
 from fastapi import FastAPI, Request, status
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
 
-from app.core.middleware import ErrorHandlingMiddleware, logger
+from app.core.logging_setup import configure_logging
+from app.core.security import shutdown_hash_pool
 from app.database.init import init_db
 from app.database.pool import db
 from app.routers.users import users_router
 from app.utils.constants import VALIDATION_ERROR_CODE
 from app.utils.exceptions import APIException
 
-# Configure logging to output to console
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+# Configure logging to output to console from a background thread
+log_listener = configure_logging(logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Pre-serialized 500 body; only the exception class name varies per failure
+_INTERNAL_ERROR_TEMPLATE = (
+    b'{"error":{"code":"INTERNAL_SERVER_ERROR",'
+    b'"message":"[%s] - An internal error occurred. Please try again later."}}'
 )
+_ERROR_BODY_SUFFIX = b"}}"
+
+
+# Bounded in case an exception ever builds its message from request data
+@lru_cache(maxsize=128)
+def _error_body_prefix(code: str, message: str) -> bytes:
+    """
+    Return the serialized error envelope up to, but excluding, its details.
+
+    Error codes and messages normally form a small fixed set, so each prefix is
+    built once; a response body is then `prefix + orjson.dumps(details) + b"}}"`.
+    """
+    envelope = orjson.dumps(
+        {"error": {"code": code, "message": message, "details": None}}
+    )
+    return envelope[: -len(b"null" + _ERROR_BODY_SUFFIX)]
+
+
+def _error_response(
+    status_code: int, code: str, message: str, details: object
+) -> Response:
+    """Build a JSON error response, reusing the cached envelope prefix."""
+    return Response(
+        content=_error_body_prefix(code, message)
+        + orjson.dumps(details)
+        + _ERROR_BODY_SUFFIX,
+        status_code=status_code,
+        media_type="application/json",
+    )
 
 
 @asynccontextmanager
@@ -26,10 +63,11 @@ async def lifespan(app: FastAPI):
 
     This async context manager is passed to FastAPI as the `lifespan` hook.
     On startup it establishes connections/resources required by the application
-    (currently it opens the database connection pool via `db.connect()` and
-    initializes the database schema with `init_db()`).
+    (currently it opens the database connection pool via `db.connect()` while
+    `init_db()` initializes the database schema on its own connection).
     On shutdown it must cleanly release those resources (closing the pool with
-    `db.disconnect()`).
+    `db.disconnect()`, stopping the password hashing workers and flushing the
+    log listener).
 
     Args:
         app (FastAPI): The application instance the lifespan is attached to.
@@ -40,16 +78,28 @@ async def lifespan(app: FastAPI):
     Notes:
         Ensure the `db` object implements `connect()` and `disconnect()` methods
         (see `database.pool.Database`). Any exceptions raised during startup
-        will prevent the application from starting.
+        will prevent the application from starting; the pool is closed first
+        so no connections are left open.
     """
-    await db.connect()
-    await init_db()
+    loop_class = type(asyncio.get_running_loop())
+    logger.info("Event loop: %s.%s", loop_class.__module__, loop_class.__qualname__)
+    # Pool creation and schema setup use separate connections, so they overlap.
+    # If either fails the other is cancelled, and a pool that did open is closed
+    # before the error stops startup.
+    try:
+        async with asyncio.TaskGroup() as startup:
+            startup.create_task(db.connect())
+            startup.create_task(init_db())
+    except BaseException:
+        await db.disconnect()
+        raise
     yield
     await db.disconnect()
+    shutdown_hash_pool()
+    log_listener.stop()
 
 
 app = FastAPI(lifespan=lifespan)
-app.add_middleware(ErrorHandlingMiddleware)
 app.include_router(users_router)
 
 
@@ -57,46 +107,52 @@ app.include_router(users_router)
 async def api_exception_handler(request: Request, exc: APIException):
     # Log the full exception for debugging
     logger.error(
-        f"✗ {request.method} {request.url.path} "
-        f"| Exception: {type(exc).__name__}: {str(exc)} ",
+        "✗ %s %s | Exception: %s: %s",
+        request.method,
+        request.url.path,
+        type(exc).__name__,
+        exc,
         exc_info=True,
     )
-    return JSONResponse(
-        status_code=exc.status_code,
-        content={
-            "error": {
-                "code": exc.code,
-                "message": exc.message,
-                "details": exc.details,
-            }
-        },
-    )
+    return _error_response(exc.status_code, exc.code, exc.message, exc.details)
 
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    # Sanitize errors to ensure they are JSON serializable
-    sanitized_errors = []
-    for error in exc.errors():
-        error_dict = {
-            "loc": error.get("loc"),
-            "msg": error.get("msg"),
-            "type": error.get("type"),
-        }
-        sanitized_errors.append(error_dict)
+    # Keep only the JSON-serializable keys of each error
+    sanitized_errors = [
+        {"loc": error["loc"], "msg": error["msg"], "type": error["type"]}
+        for error in exc.errors()
+    ]
     # Log the full exception for debugging
     logger.error(
-        f"✗ {request.method} {request.url.path} "
-        f"| Exception: {type(exc).__name__}: {str(error_dict["msg"])} ",
+        "✗ %s %s | Exception: %s: %s",
+        request.method,
+        request.url.path,
+        type(exc).__name__,
+        sanitized_errors[-1]["msg"] if sanitized_errors else None,
         exc_info=True,
     )
-    return JSONResponse(
-        status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
-        content={
-            "error": {
-                "code": VALIDATION_ERROR_CODE,
-                "message": "Invalid request payload",
-                "details": sanitized_errors,
-            }
-        },
+    return _error_response(
+        status.HTTP_422_UNPROCESSABLE_CONTENT,
+        VALIDATION_ERROR_CODE,
+        "Invalid request payload",
+        sanitized_errors,
+    )
+
+
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    # Starlette re-raises after this handler, so the server logs the traceback
+    logger.error(
+        "✗ %s %s | Exception: %s: %s",
+        request.method,
+        request.url.path,
+        type(exc).__name__,
+        exc,
+    )
+    return Response(
+        content=_INTERNAL_ERROR_TEMPLATE % type(exc).__name__.encode(),
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        media_type="application/json",
     )
@@ -1,87 +1,165 @@
 """Pytest configuration and fixtures for testing."""
 
 import asyncpg
+import pytest
 import pytest_asyncio
+from cachetools import TTLCache
 from httpx import ASGITransport, AsyncClient
 
 from app.core.config import settings
 from app.core.dependencies import get_db
+from app.core.security import (hash_password, password_needs_rehash,
+                               verify_password)
+from app.database.init import apply_schema
+from app.database.pool import SERVER_SETTINGS, init_connection
+from app.database.users import USER_CACHE_MAX_SIZE, USER_CACHE_TTL
 from main import app
 
+FAKE_HASH_PREFIX = "$fake$"
 
-@pytest_asyncio.fixture
-async def test_db_pool():
-    """Create a test database and pool, yield it, then clean up."""
+
+async def fake_hash_password(password: str) -> str:
+    """Stand-in for argon2 hashing: tests exercise the flow, not the KDF."""
+    return FAKE_HASH_PREFIX + password
+
+
+async def fake_verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Check a password against a hash made by `fake_hash_password`."""
+    return hashed_password == FAKE_HASH_PREFIX + plain_password
+
+
+@pytest.fixture(autouse=True)
+def fast_password_hashing(monkeypatch):
+    """
+    Replace argon2 hashing with a trivial reversible scheme for every test.
+
+    The service imports the helpers by name, so they are patched there as well
+    as in `app.core.security`. Fake hashes never need rehashing.
+    """
+    for module in ("app.core.security", "app.services.users"):
+        monkeypatch.setattr(f"{module}.hash_password", fake_hash_password)
+        monkeypatch.setattr(f"{module}.verify_password", fake_verify_password)
+    monkeypatch.setattr("app.services.users.password_needs_rehash", lambda _: False)
+
+
+@pytest.fixture
+def real_password_hashing(monkeypatch):
+    """Restore argon2 hashing, run in the worker processes, for one test."""
+    for module in ("app.core.security", "app.services.users"):
+        monkeypatch.setattr(f"{module}.hash_password", hash_password)
+        monkeypatch.setattr(f"{module}.verify_password", verify_password)
+    monkeypatch.setattr(
+        "app.services.users.password_needs_rehash", password_needs_rehash
+    )
+
+
+def _patch_user_cache_enabled(monkeypatch, enabled: bool):
+    """Make repositories built by `get_user_repository` see the given flag."""
+    patched = settings.model_copy(update={"user_cache_enabled": enabled})
+    monkeypatch.setattr("app.core.dependencies.get_settings", lambda: patched)
+
+
+@pytest.fixture(autouse=True)
+def disable_user_cache(monkeypatch):
+    """
+    Disable the in-process user cache for every test.
+
+    Each test's writes are rolled back, so cached rows would outlive the data
+    they were read from and leak into later tests.
+    """
+    _patch_user_cache_enabled(monkeypatch, False)
+
+
+@pytest.fixture
+def user_cache(monkeypatch):
+    """Enable a fresh, empty user cache for one test and return it."""
+    cache = TTLCache(maxsize=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL)
+    monkeypatch.setattr("app.core.dependencies.user_cache", cache)
+    _patch_user_cache_enabled(monkeypatch, True)
+    return cache
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def test_db_conn():
+    """
+    Provide one connection to the test database, creating the database if missing.
+
+    The database is kept between runs; leftover rows are truncated at session
+    start, which is far cheaper than dropping and re-creating the database.
+    Tests run one at a time, so a single connection replaces a pool.
+    """
     base_url = settings.database_url.rsplit("/", 1)[0]  # Get base URL without DB name
     # Use a separate test database
     test_database_name = "user_registration_test"
     test_db_url = base_url + "/" + test_database_name
 
-    # Connect to postgres (system DB) to create/drop the test DB
+    # Connect to postgres (system DB) to create the test DB on first use
     postgres_system_url = base_url + "/postgres"
     postgres_conn = await asyncpg.connect(postgres_system_url)
 
     try:
-        # Drop the test database if it exists
-        await postgres_conn.execute(f"DROP DATABASE IF EXISTS {test_database_name}")
-        # Create the test database
-        await postgres_conn.execute(f"CREATE DATABASE {test_database_name}")
+        database_exists = await postgres_conn.fetchval(
+            "SELECT 1 FROM pg_database WHERE datname = $1", test_database_name
+        )
+        if not database_exists:
+            await postgres_conn.execute(f"CREATE DATABASE {test_database_name}")
     finally:
         await postgres_conn.close()
 
-    # Create connection pool to test database
-    pool = await asyncpg.create_pool(
-        dsn=test_db_url,
-        min_size=1,
-        max_size=10,
-        command_timeout=30,
+    # Open the connection to the test database, configured like pooled ones
+    conn = await asyncpg.connect(
+        dsn=test_db_url, command_timeout=30, server_settings=SERVER_SETTINGS
     )
+    await init_connection(conn)
 
-    # Initialize schema in test database
-    async with pool.acquire() as conn:
-        query = """
-        CREATE TABLE IF NOT EXISTS users (
-            id UUID PRIMARY KEY,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            is_active BOOLEAN DEFAULT FALSE,
-            activation_code CHAR(4),
-            activation_expires_at TIMESTAMP,
-            created_at TIMESTAMP DEFAULT now()
-        );
-        """
-        await conn.execute(query)
-
-    yield pool
-
-    # Cleanup: close pool and drop test database
-    await pool.close()
+    # Initialize schema in test database and clear rows left by a previous run
+    await apply_schema(conn)
+    await conn.execute("TRUNCATE users RESTART IDENTITY CASCADE")
 
-    postgres_conn = await asyncpg.connect(postgres_system_url)
-    try:
-        await postgres_conn.execute(f"DROP DATABASE IF EXISTS {test_database_name}")
-    finally:
-        await postgres_conn.close()
+    yield conn
+
+    # Cleanup: close the connection, the test database is reused by the next run
+    await conn.close()
 
 
-@pytest_asyncio.fixture
-async def test_client(test_db_pool):
-    """Provide a test client with overridden database dependency."""
+@pytest.fixture(scope="session")
+def override_db_dependency(test_db_conn):
+    """Route get_db to the test connection for the rest of the session."""
 
     async def override_get_db():
-        """Override get_db to use test pool and wrap in transaction."""
-        async with test_db_pool.acquire() as conn:
-            # Start a transaction
-            async with conn.transaction():
-                yield conn
+        """Override get_db to reuse the test connection, one savepoint per request."""
+        async with test_db_conn.transaction():
+            yield test_db_conn
 
     # Override the dependency
     app.dependency_overrides[get_db] = override_get_db
-
-    async with AsyncClient(
-        transport=ASGITransport(app=app), base_url="http://test"
-    ) as client:
-        yield client
-
+    yield
     # Clear overrides
     app.dependency_overrides.clear()
+
+
+@pytest.fixture(scope="session")
+def test_transport():
+    """Provide one ASGI transport to the app, shared by every test client."""
+    return ASGITransport(app=app)
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def test_client(test_db_conn, override_db_dependency, test_transport):
+    """
+    Provide a test client bound to the shared transport.
+
+    Every request of a test runs on the same connection inside one transaction,
+    which is rolled back when the test ends so tests never see each other's rows.
+    """
+    test_transaction = test_db_conn.transaction()
+    await test_transaction.start()
+
+    try:
+        async with AsyncClient(
+            transport=test_transport, base_url="http://test"
+        ) as client:
+            yield client
+    finally:
+        # Discard everything the test wrote
+        await test_transaction.rollback()
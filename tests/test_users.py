@@ -1,12 +1,17 @@
 """Tests for the user endpoints."""
 
+import uuid
 from datetime import datetime, timedelta, timezone
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
+import asyncpg
 import pytest
-from fastapi import status
+from argon2 import PasswordHasher
+from fastapi import FastAPI, status
+from httpx import ASGITransport, AsyncClient
 
-from app.core.security import hash_password
+from app.core import security
+from app.database.init import apply_schema
 from app.utils.constants import (EXPIRED_ACTIVATION_CODE_ERROR_CODE,
                                  INVALID_ACTIVATION_CODE_ERROR_CODE,
                                  INVALID_EMAIL_ERROR_CODE,
@@ -15,6 +20,7 @@ from app.utils.constants import (EXPIRED_ACTIVATION_CODE_ERROR_CODE,
                                  USER_ALREADY_EXISTS_ERROR_CODE,
                                  USER_STATUS_ACTIVATED, USER_STATUS_CREATED,
                                  VALIDATION_ERROR_CODE)
+from main import unhandled_exception_handler
 
 
 # The following tests cover the user creation flow, including success and various error scenarios.
@@ -108,6 +114,25 @@ async def test_create_user_duplicate_email(test_client):
     assert error_data["error"]["code"] == USER_ALREADY_EXISTS_ERROR_CODE
 
 
+@pytest.mark.asyncio
+async def test_create_user_duplicate_email_different_case(test_client):
+    """Test that emails differing only in case are treated as duplicates."""
+    response1 = await test_client.post(
+        "/users",
+        json={"email": "Case.Duplicate@Example.com", "password": "password123"},
+    )
+    assert response1.status_code == status.HTTP_201_CREATED
+    # The response reports the email as it is stored
+    assert response1.json()["email"] == "case.duplicate@example.com"
+
+    response2 = await test_client.post(
+        "/users",
+        json={"email": "case.duplicate@example.com", "password": "password456"},
+    )
+    assert response2.status_code == status.HTTP_409_CONFLICT
+    assert response2.json()["error"]["code"] == USER_ALREADY_EXISTS_ERROR_CODE
+
+
 # The following tests cover the user activation flow, including success and various error scenarios.
 # Each test case is parameterized to cover different combinations of inputs and expected outcomes.
 @pytest.mark.asyncio
@@ -278,6 +303,24 @@ async def test_activate_user_already_activated(test_client):
     assert second_activate.json()["error"]["code"] == USER_ALREADY_ACTIVATED_ERROR_CODE
 
 
+@pytest.mark.asyncio
+async def test_activate_user_unknown_email_verifies_dummy_hash(test_client):
+    """Test that an unknown email still pays for a password verification."""
+    with patch(
+        "app.services.users.verify_password", new_callable=AsyncMock
+    ) as mock_verify:
+        mock_verify.return_value = False
+
+        activate_response = await test_client.post(
+            "/users/activate",
+            json={"code": "1234"},
+            auth=("unknown@example.com", "password123"),
+        )
+
+    assert activate_response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert activate_response.json()["error"]["code"] == INVALID_EMAIL_ERROR_CODE
+    mock_verify.assert_awaited_once_with("password123", security.DUMMY_PASSWORD_HASH)
+
 @pytest.mark.asyncio
 async def test_activate_user_expired_code(test_client):
     """Test activation with expired activation code."""
@@ -301,15 +344,13 @@ async def test_activate_user_expired_code(test_client):
     # For this test, we will simulate an expired code by mocking the verification
 
     # Mock the repository to return a user with an expired code
-    expired_time = (datetime.now(timezone.utc) - timedelta(hours=2)).replace(
-        tzinfo=None
-    )
+    expired_time = datetime.now(timezone.utc) - timedelta(hours=2)
 
     with patch("app.database.users.UserRepository.get_user_by_email") as mock_get:
         user_data = {
             "id": "test-id",
             "email": email,
-            "password_hash": hash_password(password),
+            "password_hash": await security.hash_password(password),
             "is_active": False,
             "activation_code": code,
             "activation_expires_at": expired_time,
@@ -327,3 +368,319 @@ async def test_activate_user_expired_code(test_client):
             activate_response.json()["error"]["code"]
             == EXPIRED_ACTIVATION_CODE_ERROR_CODE
         )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "payload_code,message",
+    [
+        ("", "Activation code cannot be empty"),
+        ("12", "Activation code must be exactly 4 characters long"),
+        ("abcd", "Activation code must contain only digits"),
+    ],
+)
+async def test_activate_user_code_validation_message(
+    test_client, payload_code, message
+):
+    """Test that invalid activation codes are reported in readable wording."""
+    response = await test_client.post(
+        "/users/activate",
+        json={"code": payload_code},
+        auth=("any@example.com", "password123"),
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+    details = response.json()["error"]["details"]
+    assert details[0]["msg"] == f"Value error, {message}"
+
+
+@pytest.mark.asyncio
+async def test_password_hashing_in_worker_processes(real_password_hashing):
+    """Test that argon2 hashing and verification work through the process pool."""
+    password_hash = await security.hash_password("password123")
+
+    assert password_hash.startswith("$argon2id$")
+    assert await security.verify_password("password123", password_hash)
+    assert not await security.verify_password("wrong_password", password_hash)
+
+
+@pytest.mark.asyncio
+async def test_activate_user_rehashes_outdated_password(
+    test_client, test_db_conn, real_password_hashing
+):
+    """Test that activation rewrites a hash made with outdated argon2 parameters."""
+    email = "rehash@example.com"
+    password = "password123"
+    code = "4321"
+
+    with patch("app.services.users.UserService._generate_code") as mock_generate:
+        mock_generate.return_value = code
+
+        create_response = await test_client.post(
+            "/users",
+            json={"email": email, "password": password},
+        )
+        assert create_response.status_code == status.HTTP_201_CREATED
+
+    # Replace the stored hash with one made by cheaper, outdated parameters
+    outdated_hash = PasswordHasher(time_cost=1, memory_cost=8 * 1024).hash(password)
+    await test_db_conn.execute(
+        "UPDATE users SET password_hash = $1 WHERE email = $2", outdated_hash, email
+    )
+
+    activate_response = await test_client.post(
+        "/users/activate",
+        json={"code": code},
+        auth=(email, password),
+    )
+    assert activate_response.status_code == status.HTTP_200_OK
+
+    stored_hash = await test_db_conn.fetchval(
+        "SELECT password_hash FROM users WHERE email = $1", email
+    )
+    assert stored_hash != outdated_hash
+    assert not security.password_needs_rehash(stored_hash)
+    assert await security.verify_password(password, stored_hash)
+
+
+@pytest.mark.asyncio
+async def test_apply_schema_upgrades_naive_timestamps(test_client, test_db_conn):
+    """Test that a users table from the old TIMESTAMP schema is migrated."""
+    # Recreate the table as older versions did; the test transaction undoes it
+    await test_db_conn.execute("DROP TABLE users")
+    await test_db_conn.execute(
+        """
+        CREATE TABLE users (
+            id UUID PRIMARY KEY,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            is_active BOOLEAN DEFAULT FALSE,
+            activation_code CHAR(4),
+            activation_expires_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT now()
+        )
+        """
+    )
+    await test_db_conn.execute(
+        "INSERT INTO users (id, email, password_hash, activation_expires_at) "
+        "VALUES ($1, $2, $3, $4)",
+        uuid.uuid4().bytes,
+        "legacy@example.com",
+        "legacy-hash",
+        datetime(2024, 1, 1, 12, 0),
+    )
+
+    await apply_schema(test_db_conn)
+    # Running it again on the upgraded table is a no-op
+    await apply_schema(test_db_conn)
+
+    column_types = await test_db_conn.fetch(
+        "SELECT column_name, data_type FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = 'users' "
+        "AND column_name IN ('activation_expires_at', 'created_at')"
+    )
+    assert {row["data_type"] for row in column_types} == {
+        "timestamp with time zone"
+    }
+    # Naive values were stored as UTC and keep their instant
+    expires_at = await test_db_conn.fetchval(
+        "SELECT activation_expires_at FROM users WHERE email = 'legacy@example.com'"
+    )
+    assert expires_at == datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_apply_schema_normalizes_stored_emails(test_client, test_db_conn):
+    """Test that accounts stored with upper-case emails stay reachable."""
+    email = "Legacy.Upper@Example.com"
+    password = "password123"
+    code = "2468"
+    await test_db_conn.execute(
+        "INSERT INTO users "
+        "(id, email, password_hash, activation_code, activation_expires_at) "
+        "VALUES ($1, $2, $3, $4, $5)",
+        uuid.uuid4().bytes,
+        email,
+        await security.hash_password(password),
+        code,
+        datetime.now(timezone.utc) + timedelta(minutes=1),
+    )
+    # The session fixture already ran the one-off normalization
+    await test_db_conn.execute(
+        "DELETE FROM schema_migrations WHERE name = 'normalize_emails'"
+    )
+
+    await apply_schema(test_db_conn)
+
+    # The same address can't be registered again in another case
+    create_response = await test_client.post(
+        "/users",
+        json={"email": email.lower(), "password": "password456"},
+    )
+    assert create_response.status_code == status.HTTP_409_CONFLICT
+    assert create_response.json()["error"]["code"] == USER_ALREADY_EXISTS_ERROR_CODE
+
+    # The existing account can still be activated
+    activate_response = await test_client.post(
+        "/users/activate",
+        json={"code": code},
+        auth=(email, password),
+    )
+    assert activate_response.status_code == status.HTTP_200_OK
+    assert activate_response.json()["status"] == USER_STATUS_ACTIVATED
+
+
+@pytest.mark.asyncio
+async def test_unhandled_exception_returns_clean_500():
+    """Test that an unhandled exception becomes a generic JSON 500 response."""
+    failing_app = FastAPI()
+    failing_app.add_exception_handler(Exception, unhandled_exception_handler)
+
+    @failing_app.get("/fail")
+    async def fail():
+        raise RuntimeError("database exploded")
+
+    # Starlette re-raises after the handler; the server, not the client, sees it
+    transport = ASGITransport(app=failing_app, raise_app_exceptions=False)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/fail")
+
+    assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {
+        "error": {
+            "code": "INTERNAL_SERVER_ERROR",
+            "message": "[RuntimeError] - An internal error occurred. "
+            "Please try again later.",
+        }
+    }
+
+
+@pytest.mark.asyncio
+async def test_activate_user_served_from_user_cache(test_client, user_cache):
+    """Test that activation right after signup skips the database lookup."""
+    email = "cached@example.com"
+    password = "password123"
+    code = "1357"
+
+    with patch("app.services.users.UserService._generate_code") as mock_generate:
+        mock_generate.return_value = code
+
+        create_response = await test_client.post(
+            "/users",
+            json={"email": email, "password": password},
+        )
+        assert create_response.status_code == status.HTTP_201_CREATED
+    assert email in user_cache
+
+    # The row written on signup answers the lookup, so no SELECT is sent
+    with patch.object(
+        asyncpg.Connection, "fetchrow", new_callable=AsyncMock
+    ) as mock_fetchrow:
+        activate_response = await test_client.post(
+            "/users/activate",
+            json={"code": code},
+            auth=(email, password),
+        )
+        assert activate_response.status_code == status.HTTP_200_OK
+        mock_fetchrow.assert_not_awaited()
+
+    # Activation drops the now stale entry
+    assert email not in user_cache
+
+    # A second activation reads the activated row from the database
+    second_activate = await test_client.post(
+        "/users/activate",
+        json={"code": code},
+        auth=(email, password),
+    )
+    assert second_activate.status_code == status.HTTP_409_CONFLICT
+    assert second_activate.json()["error"]["code"] == USER_ALREADY_ACTIVATED_ERROR_CODE
+    # The row it read is cached for the next lookup
+    assert user_cache[email]["is_active"] is True
+
+
+@pytest.mark.asyncio
+async def test_user_cache_only_filled_by_authenticated_lookups(test_client, user_cache):
+    """Test that a lookup with a wrong password leaves the cache untouched."""
+    email = "uncached@example.com"
+    password = "password123"
+
+    with patch("app.services.users.UserService._generate_code") as mock_generate:
+        mock_generate.return_value = "1111"
+
+        create_response = await test_client.post(
+            "/users",
+            json={"email": email, "password": password},
+        )
+        assert create_response.status_code == status.HTTP_201_CREATED
+    user_cache.clear()
+
+    activate_response = await test_client.post(
+        "/users/activate",
+        json={"code": "0000"},
+        auth=(email, "wrongpassword"),
+    )
+    assert activate_response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert email not in user_cache
+
+    # The right password caches the row, even though the code is wrong
+    activate_response = await test_client.post(
+        "/users/activate",
+        json={"code": "0000"},
+        auth=(email, password),
+    )
+    assert activate_response.json()["error"]["code"] == (
+        INVALID_ACTIVATION_CODE_ERROR_CODE
+    )
+    assert email in user_cache
+
+
+@pytest.mark.asyncio
+async def test_stale_user_cache_entry_cannot_activate_twice(test_client, user_cache):
+    """Test that a cached inactive row for an activated user still gives 409."""
+    email = "stale@example.com"
+    password = "password123"
+    code = "8642"
+
+    with patch("app.services.users.UserService._generate_code") as mock_generate:
+        mock_generate.return_value = code
+
+        create_response = await test_client.post(
+            "/users",
+            json={"email": email, "password": password},
+        )
+        assert create_response.status_code == status.HTTP_201_CREATED
+    stale_user = dict(user_cache[email])
+
+    first_activate = await test_client.post(
+        "/users/activate",
+        json={"code": code},
+        auth=(email, password),
+    )
+    assert first_activate.status_code == status.HTTP_200_OK
+
+    # Another worker's cache would still hold the row from before activation
+    user_cache[email] = stale_user
+    second_activate = await test_client.post(
+        "/users/activate",
+        json={"code": code},
+        auth=(email, password),
+    )
+    assert second_activate.status_code == status.HTTP_409_CONFLICT
+    assert second_activate.json()["error"]["code"] == USER_ALREADY_ACTIVATED_ERROR_CODE
+
+
+@pytest.mark.asyncio
+async def test_hash_pool_recovers_from_dead_worker(real_password_hashing):
+    """Test that hashing keeps working after a worker process is killed."""
+    # Make sure at least one worker is running, then kill it like the OOM killer
+    await security.hash_password("warm-up")
+    broken_pool = security._HASH_POOL
+    worker = next(iter(broken_pool._processes.values()))
+    worker.kill()
+    worker.join()
+
+    password_hash = await security.hash_password("password123")
+
+    assert security._HASH_POOL is not broken_pool
+    assert await security.verify_password("password123", password_hash)